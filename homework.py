@@ -1,14 +1,22 @@
+import atexit
+import json
 import logging
 import os
+import queue
 import sys
 import time
+from collections import deque
 from http import HTTPStatus
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from types import MappingProxyType
 
+import orjson
 import requests
 import telegram
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from telegram.error import TelegramError
+from urllib3.util.retry import Retry
 
 from exceptions import (
     EndpointException,
@@ -24,11 +32,15 @@ handler = RotatingFileHandler(
     maxBytes=50000000,
     backupCount=5,
 )
-logger.addHandler(handler)
 formatter = logging.Formatter(
     "%(asctime)s, %(levelname)s, %(message)s, %(funcName)s, %(lineno)s"
 )
 handler.setFormatter(formatter)
+log_queue = queue.Queue(-1)
+logger.addHandler(QueueHandler(log_queue))
+listener = QueueListener(log_queue, handler)
+listener.start()
+atexit.register(listener.stop)
 
 PRACTICUM_TOKEN = os.getenv("PRACTICUM_TOKEN")
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
@@ -36,19 +48,49 @@ TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
 RETRY_PERIOD = 600
 ENDPOINT = "https://practicum.yandex.ru/api/user_api/homework_statuses/"
-HEADERS = {"Authorization": f"OAuth {PRACTICUM_TOKEN}"}
+HEADERS = {}
+REQUEST_TIMEOUT = (3.05, 27)
+STATE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "telegram_state.json"
+)
+SEEN_MAXLEN = 1000
+MESSAGE_LIMIT = 4000
+
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=4,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[500, 502, 503, 504],
+            raise_on_status=False,
+        ),
+    ),
+)
+
 
+_VERDICT_TEMPLATE = 'Изменился статус проверки работы "{}". {}'.format
 
-HOMEWORK_VERDICTS = {
-    "approved": "Работа проверена: ревьюеру всё понравилось. Ура!",
-    "reviewing": "Работа взята на проверку ревьюером.",
-    "rejected": "Работа проверена: у ревьюера есть замечания.",
-}
+HOMEWORK_VERDICTS = MappingProxyType(
+    {
+        "approved": "Работа проверена: ревьюеру всё понравилось. Ура!",
+        "reviewing": "Работа взята на проверку ревьюером.",
+        "rejected": "Работа проверена: у ревьюера есть замечания.",
+    }
+)
 
 
 def check_tokens() -> bool:
     """Проверяет доступность переменных окружения."""
-    return all([PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID])
+    return all((PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID))
+
+
+def build_headers() -> dict:
+    """Собирает заголовки запроса к API из проверенного токена."""
+    return {"Authorization": f"OAuth {PRACTICUM_TOKEN}"}
 
 
 def send_message(bot, message):
@@ -68,7 +110,12 @@ def get_api_answer(timestamp):
     params = {"from_date": timestamp}
     try:
         logger.debug(f"Начало запроса к API:{ENDPOINT}, {params}")
-        response = requests.get(ENDPOINT, headers=HEADERS, params=params)
+        response = SESSION.get(
+            ENDPOINT,
+            headers=HEADERS,
+            params=params,
+            timeout=REQUEST_TIMEOUT,
+        )
     except requests.RequestException:
         raise EndpointException("Ошибка при запросе к API")
 
@@ -76,9 +123,11 @@ def get_api_answer(timestamp):
         status_code = response.status_code
         raise EndpointException(f"Ошибка {status_code}")
     try:
-        return response.json()
-    except requests.RequestException:
-        raise ParseStatusException("Ошибка парсинга ответа из формата json")
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError as error:
+        raise ParseStatusException(
+            "Ошибка парсинга ответа из формата json"
+        ) from error
 
 
 def check_response(response) -> list:
@@ -109,49 +158,139 @@ def parse_status(homework) -> str:
         raise ParseStatusException(
             "Недокументированный статус домашней работы в ответе от API"
         )
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    return _VERDICT_TEMPLATE(homework_name, verdict)
+
+
+def homework_key(homework) -> tuple:
+    """Возвращает ключ, по которому статус работы считается отправленным."""
+    return (
+        homework.get("homework_name"),
+        homework.get("status"),
+        homework.get("date_updated"),
+    )
+
+
+def load_state() -> dict:
+    """Загружает из файла отправленные статусы и timestamp."""
+    try:
+        with open(STATE_FILE, encoding="utf-8") as file:
+            state = json.load(file)
+        if not isinstance(state, dict):
+            raise TypeError("Состояние не словарь")
+        timestamp = state.get("timestamp")
+        if timestamp is not None and not isinstance(timestamp, int):
+            raise TypeError("timestamp в состоянии не число")
+        seen = state.get("seen", [])
+        if not isinstance(seen, list) or not all(
+            isinstance(key, list) for key in seen
+        ):
+            raise TypeError("seen в состоянии не список списков")
+        keys = list(dict.fromkeys(tuple(key) for key in seen))
+    except (OSError, ValueError, TypeError, AttributeError) as error:
+        logger.debug(f"Файл состояния {STATE_FILE} не прочитан: {error}")
+        return {"timestamp": None, "seen": []}
+    return {"timestamp": timestamp, "seen": keys}
+
+
+def save_state(timestamp, seen_order) -> None:
+    """Атомарно сохраняет в файл отправленные статусы и timestamp."""
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_file = f"{STATE_FILE}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        json.dump(
+            {"timestamp": timestamp, "seen": list(seen_order)},
+            file,
+            ensure_ascii=False,
+        )
+    os.replace(tmp_file, STATE_FILE)
+
+
+def remember_homework(key, seen, seen_order) -> None:
+    """Запоминает отправленный статус, вытесняя самый старый."""
+    if len(seen_order) == seen_order.maxlen:
+        seen.discard(seen_order[0])
+    seen_order.append(key)
+    seen.add(key)
+
+
+def parse_new_statuses(homeworks, seen) -> tuple:
+    """Собирает сообщения о новых статусах и ошибки разбора работ."""
+    keys = []
+    messages = []
+    errors = []
+    for homework in homeworks:
+        key = homework_key(homework)
+        if key in seen:
+            continue
+        try:
+            messages.append(parse_status(homework))
+        except (KeyError, ParseStatusException) as error:
+            errors.append(str(error))
+            continue
+        keys.append(key)
+    return keys, messages, errors
+
+
+def join_messages(messages) -> list:
+    """Склеивает сообщения в блоки, укладывающиеся в лимит Telegram."""
+    chunks = []
+    chunk = ""
+    for message in messages:
+        if chunk and len(chunk) + len(message) + 2 >= MESSAGE_LIMIT:
+            chunks.append(chunk)
+            chunk = message
+        else:
+            chunk = f"{chunk}\n\n{message}" if chunk else message
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def report_error(bot, error, error_message) -> str:
+    """Логирует ошибку и отправляет её в Telegram, если она новая."""
+    logger.error(error)
+    message = str(error)
+    if message != error_message:
+        send_message(bot, message)
+    return message
 
 
 def main():
     """Основная логика работы бота."""
+    global HEADERS
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    timestamp = int(time.time())
-    cache_message = ""
     error_message = ""
     if not check_tokens():
         logger.critical("Отсутствуют одна или несколько переменных окружения")
         sys.exit(["Отсутствуют одна или несколько переменных окружения"])
+    HEADERS = build_headers()
+    state = load_state()
+    timestamp = state["timestamp"] or int(time.time())
+    seen = set()
+    seen_order = deque(maxlen=SEEN_MAXLEN)
+    for key in state["seen"]:
+        remember_homework(key, seen, seen_order)
     while True:
+        next_poll = time.monotonic() + RETRY_PERIOD
         try:
             response = get_api_answer(timestamp)
             homeworks = check_response(response)
-            if homeworks:
-                message = parse_status(homeworks[0])
-                send_message(bot, message)
-                timestamp = response.get("current_date")
-                if message != cache_message:
-                    send_message(bot, message)
-                    cache_message = message
-                    timestamp = int(time.time())
-            else:
+            keys, messages, errors = parse_new_statuses(homeworks, seen)
+            for chunk in join_messages(messages):
+                send_message(bot, chunk)
+            for key in keys:
+                remember_homework(key, seen, seen_order)
+            if not messages:
                 logger.debug("Отсутствует новая информация")
+            timestamp = response.get("current_date", timestamp)
+            save_state(timestamp, seen_order)
+            if errors:
+                raise ParseStatusException("\n".join(errors))
 
         except Exception as error:
-            logger.error(error)
-            message_t = str(error)
-            if message_t != error_message:
-                send_message(bot, message_t)
-                error_message = message_t
-            time.sleep(RETRY_PERIOD)
-        finally:
-            time.sleep(RETRY_PERIOD)
+            error_message = report_error(bot, error, error_message)
+        time.sleep(max(0, next_poll - time.monotonic()))
 
 
 if __name__ == "__main__":
-    logging.basicConfig(
-        level=logging.DEBUG,
-        filename="main.log",
-        format="%(funcName)s, %(lineno)s, %(levelname)s, %(message)s",
-        filemode="w",
-    )
     main()
@@ -29,3 +29,11 @@ def random_message():
         letters = string.ascii_letters
         return ''.join(random.choice(letters) for _ in range(string_length))
     return random_string()
+
+
+@pytest.fixture(autouse=True)
+def state_file(tmp_path, monkeypatch):
+    import homework
+    path = tmp_path / 'telegram_state.json'
+    monkeypatch.setattr(homework, 'STATE_FILE', str(path))
+    return path
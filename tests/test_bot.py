@@ -1,9 +1,11 @@
 import inspect
+import json
 import logging
 import re
 import time
 from http import HTTPStatus
 
+import orjson
 import pytest
 import requests
 import telegram
@@ -35,6 +37,32 @@ def get_mock_telegram_bot(monkeypatch, random_message):
     return telegram.Bot(token='')
 
 
+def mock_api_homeworks(monkeypatch, homework_module, random_timestamp,
+                       homeworks):
+    monkeypatch.setattr(
+        homework_module.SESSION,
+        'get',
+        create_mock_response_get_with_custom_status_and_data(
+            random_timestamp=random_timestamp,
+            http_status=HTTPStatus.OK,
+            data={
+                'homeworks': homeworks,
+                'current_date': random_timestamp
+            }
+        )
+    )
+
+
+def collect_sent_messages(monkeypatch, homework_module):
+    sent_messages = []
+
+    def mock_send_message(bot, message=''):
+        sent_messages.append(message)
+
+    monkeypatch.setattr(homework_module, 'send_message', mock_send_message)
+    return sent_messages
+
+
 class TestHomework:
     HOMEWORK_VERDICTS = {
         'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
@@ -191,7 +219,10 @@ class TestHomework:
                     'Проверьте, что в параметре `from_date` передано число.'
                 )
 
-        monkeypatch.setattr(requests, 'get', check_request_get_call)
+        monkeypatch.setattr(homework_module.SESSION, 'get',
+                            check_request_get_call)
+        monkeypatch.setattr(homework_module, 'HEADERS',
+                            homework_module.build_headers())
         try:
             homework_module.get_api_answer(current_timestamp)
         except AssertionError as e:
@@ -214,13 +245,33 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(homework_module.SESSION, 'get',
+                            mock_response_get)
 
         result = homework_module.get_api_answer(current_timestamp)
         assert isinstance(result, dict), (
             f'Проверьте, что функция `{func_name}` возвращает словарь.'
         )
 
+    def test_request_get_timeout(self, monkeypatch, random_timestamp,
+                                 current_timestamp, homework_module):
+        calls = []
+
+        def mock_response_get(*args, **kwargs):
+            calls.append(kwargs)
+            return utils.MockResponseGET(
+                *args, random_timestamp=random_timestamp, **kwargs
+            )
+
+        monkeypatch.setattr(homework_module.SESSION, 'get',
+                            mock_response_get)
+        homework_module.get_api_answer(current_timestamp)
+        assert calls and calls[0].get('timeout') == (
+            homework_module.REQUEST_TIMEOUT
+        ), (
+            'Проверьте, что в запрос к API передан `timeout`.'
+        )
+
     @pytest.mark.parametrize('response', NOT_OK_RESPONSES.values())
     def test_get_not_200_status_response(self,
                                          monkeypatch,
@@ -234,7 +285,7 @@ class TestHomework:
             self.HOMEWORK_FUNC_WITH_PARAMS_QTY[func_name]
         )
 
-        monkeypatch.setattr(requests, 'get', response)
+        monkeypatch.setattr(homework_module.SESSION, 'get', response)
         try:
             homework_module.get_api_answer(current_timestamp)
         except Exception:
@@ -258,7 +309,9 @@ class TestHomework:
         def mock_request_get_with_exception(*args, **kwargs):
             raise requests.RequestException('Something wrong')
 
-        monkeypatch.setattr(requests, 'get', mock_request_get_with_exception)
+        monkeypatch.setattr(
+            homework_module.SESSION, 'get', mock_request_get_with_exception
+        )
         try:
             homework_module.get_api_answer(current_timestamp)
         except requests.RequestException:
@@ -270,6 +323,20 @@ class TestHomework:
         except Exception:
             pass
 
+    def test_get_api_answer_with_invalid_json(self, current_timestamp,
+                                              monkeypatch,
+                                              homework_module):
+        def mock_response_get(*args, **kwargs):
+            return utils.MockResponseGET(*args, content=b'not json', **kwargs)
+
+        monkeypatch.setattr(homework_module.SESSION, 'get',
+                            mock_response_get)
+        with pytest.raises(homework_module.ParseStatusException) as error:
+            homework_module.get_api_answer(current_timestamp)
+        assert isinstance(error.value.__cause__, orjson.JSONDecodeError), (
+            'Убедитесь, что ошибка парсинга json сохраняется в `__cause__`.'
+        )
+
     def test_parse_status_with_expected_statuses(self, homework_module):
         func_name = 'parse_status'
         utils.check_function(
@@ -549,7 +616,7 @@ class TestHomework:
 
         main_source = inspect.getsource(homework_module.main)
         time_sleep_pattern = re.compile(
-            r'(\# *)?(time\.sleep\( *[\w\d=_\-\'\"]* *\))'
+            r'(\# *)?(time\.sleep\()'
         )
         search_result = re.search(time_sleep_pattern, main_source)
         is_commented = search_result[1] is None if search_result else False
@@ -558,9 +625,9 @@ class TestHomework:
         )
 
         def sleep_to_interrupt(secs):
-            assert secs == self.RETRY_PERIOD, (
+            assert self.RETRY_PERIOD - 5 < secs <= self.RETRY_PERIOD, (
                 'Убедитесь, что повторный запрос к API домашки отправляется '
-                'через 10 минут: `time.sleep(RETRY_PERIOD)`.'
+                'через 10 минут после начала предыдущего.'
             )
             raise utils.BreakInfiniteLoop('break')
 
@@ -586,7 +653,9 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(homework_module.SESSION, 'get',
+                            mock_response_get)
+        monkeypatch.setattr(homework_module, 'HEADERS', {})
 
     def test_main_without_env_vars_raise_exception(
             self, caplog, monkeypatch, random_timestamp, current_timestamp,
@@ -618,6 +687,34 @@ class TestHomework:
             except Exception:
                 pass
 
+    def test_main_builds_headers_after_check_tokens(
+            self, monkeypatch, random_timestamp, current_timestamp,
+            random_message, homework_module
+    ):
+        self.mock_main(
+            monkeypatch,
+            random_message,
+            random_timestamp,
+            current_timestamp,
+            homework_module
+        )
+        monkeypatch.setattr(homework_module, 'PRACTICUM_TOKEN', None)
+        with pytest.raises(SystemExit):
+            homework_module.main()
+        assert 'Authorization' not in homework_module.HEADERS, (
+            'Убедитесь, что заголовок `Authorization` собирается только '
+            'после проверки токенов.'
+        )
+
+        monkeypatch.setattr(homework_module, 'PRACTICUM_TOKEN', 'sometoken')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abcdefg')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '12345')
+        with pytest.raises(utils.BreakInfiniteLoop):
+            homework_module.main()
+        assert homework_module.HEADERS == {
+            'Authorization': 'OAuth sometoken'
+        }
+
     def test_main_send_request_to_api(self, monkeypatch, random_timestamp,
                                       current_timestamp, random_message,
                                       caplog, homework_module):
@@ -640,7 +737,7 @@ class TestHomework:
                     if record.message == utils.MockResponseGET.CALLED_LOG_MSG
                 ]
                 assert log_record, (
-                    'Убедитесь, что бот использует функцию `requests.get()` '
+                    'Убедитесь, что бот использует метод `SESSION.get()` '
                     'для отправки запроса к API домашки.'
                 )
 
@@ -723,7 +820,7 @@ class TestHomework:
                 data=data_with_new_hw_status
             ))
         monkeypatch.setattr(
-            requests,
+            homework_module.SESSION,
             'get',
             mock_response_get_with_new_status
         )
@@ -752,6 +849,181 @@ class TestHomework:
                     'из переменной `HOMEWORK_VERDICTS`.'
                 )
 
+    def test_main_skips_already_sent_status(self, monkeypatch,
+                                            random_timestamp,
+                                            current_timestamp,
+                                            random_message,
+                                            state_file, homework_module):
+        self.mock_main(
+            monkeypatch,
+            random_message,
+            random_timestamp,
+            current_timestamp,
+            homework_module
+        )
+        homework = {
+            'homework_name': 'hw123',
+            'status': 'approved'
+        }
+        state_file.write_text(json.dumps({
+            'timestamp': random_timestamp,
+            'seen': [list(homework_module.homework_key(homework))]
+        }))
+        mock_api_homeworks(
+            monkeypatch, homework_module, random_timestamp, [homework]
+        )
+        sent_messages = collect_sent_messages(monkeypatch, homework_module)
+        try:
+            homework_module.main()
+        except utils.BreakInfiniteLoop:
+            pass
+        assert not sent_messages, (
+            'Убедитесь, что после перезапуска бот не отправляет повторно '
+            'уже отправленный статус домашней работы.'
+        )
+
+    @pytest.mark.parametrize('content', [
+        '[]',
+        '{"seen": [1]}',
+        '{"seen": null}',
+        '{"seen": [[[1]]]}',
+        '{"timestamp": "abc"}',
+        '{"timestamp": 1, "se',
+    ])
+    def test_load_state_with_malformed_file(self, content, state_file,
+                                            homework_module):
+        state_file.write_text(content)
+        assert homework_module.load_state() == {
+            'timestamp': None, 'seen': []
+        }, (
+            'Убедитесь, что повреждённый файл состояния не ломает запуск '
+            'бота.'
+        )
+
+    def test_save_state_roundtrip(self, state_file, homework_module):
+        homework_module.save_state(123, [('hw123', 'approved', None)])
+        assert homework_module.load_state() == {
+            'timestamp': 123, 'seen': [('hw123', 'approved', None)]
+        }
+        assert [path.name for path in state_file.parent.iterdir()] == [
+            state_file.name
+        ]
+
+    def test_main_sleeps_until_poll_deadline(
+            self, monkeypatch, random_timestamp, current_timestamp,
+            random_message, homework_module
+    ):
+        self.mock_main(
+            monkeypatch,
+            random_message,
+            random_timestamp,
+            current_timestamp,
+            homework_module
+        )
+        clock = iter([100.0, 130.0])
+        monkeypatch.setattr(
+            homework_module.time, 'monotonic', lambda: next(clock, 130.0)
+        )
+        sleeps = []
+
+        def mock_sleep(secs):
+            sleeps.append(secs)
+            raise utils.BreakInfiniteLoop('break')
+
+        monkeypatch.setattr(homework_module.time, 'sleep', mock_sleep)
+        with pytest.raises(utils.BreakInfiniteLoop):
+            homework_module.main()
+        assert sleeps == [self.RETRY_PERIOD - 30], (
+            'Убедитесь, что время обработки ответа вычитается из паузы '
+            'перед следующим запросом к API домашки.'
+        )
+
+    def test_main_saves_current_date(self, monkeypatch, random_timestamp,
+                                     current_timestamp, random_message,
+                                     state_file, homework_module):
+        self.mock_main(
+            monkeypatch,
+            random_message,
+            random_timestamp,
+            current_timestamp,
+            homework_module
+        )
+        try:
+            homework_module.main()
+        except utils.BreakInfiniteLoop:
+            pass
+        state = json.loads(state_file.read_text())
+        assert state['timestamp'] == random_timestamp, (
+            'Убедитесь, что следующий запрос к API домашки отправляется '
+            'с `from_date`, равным `current_date` из предыдущего ответа.'
+        )
+
+    def test_main_sends_new_statuses_in_one_message(
+            self, monkeypatch, random_timestamp, current_timestamp,
+            random_message, homework_module
+    ):
+        self.mock_main(
+            monkeypatch,
+            random_message,
+            random_timestamp,
+            current_timestamp,
+            homework_module
+        )
+        mock_api_homeworks(monkeypatch, homework_module, random_timestamp, [
+            {'homework_name': 'hw1', 'status': 'approved'},
+            {'homework_name': 'hw2', 'status': 'rejected'}
+        ])
+        sent_messages = collect_sent_messages(monkeypatch, homework_module)
+        try:
+            homework_module.main()
+        except utils.BreakInfiniteLoop:
+            pass
+        assert len(sent_messages) == 1, (
+            'Убедитесь, что новые статусы нескольких домашних работ '
+            'отправляются в Telegram одним сообщением.'
+        )
+        assert '"hw1"' in sent_messages[0] and '"hw2"' in sent_messages[0]
+
+    def test_main_skips_homework_with_unknown_status(
+            self, monkeypatch, random_timestamp, current_timestamp,
+            random_message, state_file, homework_module
+    ):
+        self.mock_main(
+            monkeypatch,
+            random_message,
+            random_timestamp,
+            current_timestamp,
+            homework_module
+        )
+        mock_api_homeworks(monkeypatch, homework_module, random_timestamp, [
+            {'homework_name': 'hw1', 'status': 'unknown'},
+            {'homework_name': 'hw2', 'status': 'approved'}
+        ])
+        sent_messages = collect_sent_messages(monkeypatch, homework_module)
+        try:
+            homework_module.main()
+        except utils.BreakInfiniteLoop:
+            pass
+        assert len(sent_messages) == 2 and '"hw2"' in sent_messages[0], (
+            'Убедитесь, что работа с недокументированным статусом не мешает '
+            'отправке остальных статусов.'
+        )
+        assert 'Недокументированный статус' in sent_messages[1], (
+            'Убедитесь, что ошибка разбора статуса домашней работы '
+            'отправляется в Telegram.'
+        )
+        state = json.loads(state_file.read_text())
+        assert state['timestamp'] == random_timestamp
+        assert [key[0] for key in state['seen']] == ['hw2']
+
+    def test_join_messages_respects_limit(self, homework_module):
+        messages = ['x' * 1500] * 5
+        chunks = homework_module.join_messages(messages)
+        assert all(
+            len(chunk) < homework_module.MESSAGE_LIMIT for chunk in chunks
+        )
+        assert '\n\n'.join(chunks) == '\n\n'.join(messages)
+
     def test_docstrings(self, homework_module):
         for func in self.HOMEWORK_FUNC_WITH_PARAMS_QTY:
             utils.check_docstring(homework_module, func)
@@ -1,3 +1,4 @@
+import json
 import logging
 from collections import namedtuple
 from contextlib import contextmanager
@@ -76,8 +77,9 @@ class MockResponseGET:
     CALLED_LOG_MSG = 'Request is sent'
 
     def __init__(self, *args, random_timestamp=None,
-                 http_status=HTTPStatus.OK, **kwargs):
+                 http_status=HTTPStatus.OK, content=None, **kwargs):
         self.random_timestamp = random_timestamp
+        self._content = content
         self.status_code = http_status
         self.reason = ''
         self.text = ''
@@ -90,6 +92,12 @@ class MockResponseGET:
         }
         return data
 
+    @property
+    def content(self):
+        if self._content is not None:
+            return self._content
+        return json.dumps(self.json()).encode()
+
 
 class MockTelegramBot:
     def __init__(self, **kwargs):